@@ -35,6 +35,7 @@ SETUP = {
     'install_requires': [
         'ops',
         'pyOpenSSL',
+        'cryptography>=39',
         'netifaces',
         'charmhelpers'
     ],
@@ -132,6 +132,7 @@ class TestAppKafka(unittest.TestCase):
         mock_warning.assert_called()
 
     @patch("os.makedirs")
+    @patch.object(kafka.urllib.request, "urlopen")
     @patch.object(kafka, "subprocess")
     @patch.object(kafka, "setFilePermissions")
     @patch.object(kafka.KafkaJavaCharmBase, "set_folders_and_permissions")
@@ -145,6 +146,7 @@ class TestAppKafka(unittest.TestCase):
                               mock_set_folders_perms,
                               mock_set_file_perms,
                               mock_subprocess_check,
+                              mock_urlopen,
                               mock_os_makedirs):
 
         harness = Harness(kafka.KafkaJavaCharmBase)
@@ -156,6 +158,8 @@ class TestAppKafka(unittest.TestCase):
         })
         k = harness.charm
         k.install_packages("openjdk-11-headless", ["test"])
+        mock_urlopen.assert_called_with(
+            "https://packages.confluent.io/deb/6.1/archive.key", timeout=30)
         self.assertIn(
             "deb [arch=amd64] https://packages.confluent.io/deb/6.1" +
             " stable main", mock_add_source.call_args[0])
@@ -0,0 +1,41 @@
+#  Licensed under the Apache License, Version 2.0 (the "License"); you may
+#  not use this file except in compliance with the License. You may obtain
+#  a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#  WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#  License for the specific language governing permissions and limitations
+#  under the License.
+
+import unittest
+
+from ops.framework import Handle
+
+from wand.contrib.coordinator import RestartEvent
+
+
+class TestContribCoordinator(unittest.TestCase):
+
+    def setUp(self):
+        super(TestContribCoordinator, self).setUp()
+
+    def _new_event(self, services):
+        return RestartEvent(Handle(None, "test", "restart"),
+                            {"a": "b"}, services)
+
+    def test_restart_event_snapshot_restore(self):
+        ev = self._new_event(["kafka", "cp,kafka"])
+        restored = self._new_event([])
+        restored.restore(ev.snapshot())
+        self.assertEqual(["kafka", "cp,kafka"], restored.svc)
+        self.assertEqual(ev.ctx, restored.ctx)
+
+    def test_restart_event_restore_legacy_snapshot(self):
+        ev = self._new_event([])
+        ev.restore({"ctx": "{}", "svc": "kafka,cp-kafka-connect"})
+        self.assertEqual(["kafka", "cp-kafka-connect"], ev.svc)
+        ev.restore({"ctx": "{}", "svc": ""})
+        self.assertEqual([], ev.svc)
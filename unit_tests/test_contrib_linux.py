@@ -1,4 +1,5 @@
 import os
+import subprocess
 import unittest
 
 import wand.contrib.linux as linux
@@ -49,3 +50,9 @@ class TestContribLinux(unittest.TestCase):
             f.close()
         self.assertEqual(result, FINALETCDHOSTS)
         __cleanup()
+
+    def test_check_call_concurrently(self):
+        linux.check_call_concurrently([["true"], ["true"]])
+        self.assertRaises(subprocess.CalledProcessError,
+                          linux.check_call_concurrently,
+                          [["true"], ["false"]])
@@ -33,6 +33,56 @@ class TestSecurity(unittest.TestCase):
     def test_break_crt_chain(self):
         self.assertEqual(2, len(security._break_crt_chain(UBUNTU_COM_CERT)))
 
+    def test_break_crt_chain_bytes(self):
+        crts = security._break_crt_chain(UBUNTU_COM_CERT.encode())
+        self.assertEqual(2, len(crts))
+        self.assertEqual(UBUNTU_COM_CERT.encode(), b"".join(crts))
+
+    def test_break_crt_chain_no_trailing_newline(self):
+        chain = UBUNTU_COM_CERT.rstrip("\n")
+        crts = security._break_crt_chain(chain)
+        self.assertEqual(2, len(crts))
+        self.assertEqual(chain, "".join(crts))
+
+    def test_save_crt_chain_to_file(self):
+        for i in ["/tmp/testchain.crt", "/tmp/testchain-ca.crt"]:
+            try:
+                os.remove(i)
+            except Exception:
+                pass
+        security.saveCrtChainToFile(UBUNTU_COM_CERT,
+                                    "/tmp/testchain.crt",
+                                    "/tmp/testchain-ca.crt")
+        with open("/tmp/testchain.crt") as f:
+            crt = f.read()
+        with open("/tmp/testchain-ca.crt") as f:
+            ca = f.read()
+        self.assertEqual(UBUNTU_COM_CERT, crt + ca)
+        self.assertEqual(0o640,
+                         os.stat("/tmp/testchain.crt").st_mode & 0o777)
+        # Refuses to overwrite cert_path unless forced
+        self.assertRaises(Exception, security.saveCrtChainToFile,
+                          UBUNTU_COM_CERT, "/tmp/testchain.crt",
+                          "/tmp/testchain-ca.crt")
+        # If only ca_chain_path exists, cert_path is not left behind
+        os.remove("/tmp/testchain.crt")
+        self.assertRaises(Exception, security.saveCrtChainToFile,
+                          UBUNTU_COM_CERT, "/tmp/testchain.crt",
+                          "/tmp/testchain-ca.crt")
+        self.assertFalse(security._check_file_exists("/tmp/testchain.crt"))
+        # force=True overwrites the existing files
+        with open("/tmp/testchain-ca.crt", "w") as f:
+            f.write("stale")
+        security.saveCrtChainToFile(UBUNTU_COM_CERT,
+                                    "/tmp/testchain.crt",
+                                    "/tmp/testchain-ca.crt",
+                                    force=True)
+        with open("/tmp/testchain.crt") as f:
+            crt = f.read()
+        with open("/tmp/testchain-ca.crt") as f:
+            ca = f.read()
+        self.assertEqual(UBUNTU_COM_CERT, crt + ca)
+
     def test_gen_self_signed(self):
         security.generateSelfSigned("/tmp", "testcert")
         self.assertEqual(True,
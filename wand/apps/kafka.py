@@ -67,12 +67,14 @@ import subprocess
 import logging
 import yaml
 import socket
+import urllib.request
 
 import pwd
 import grp
 
 from wand.contrib.java import JavaCharmBase
 from wand.contrib.linux import (
+    check_call_concurrently,
     userAdd,
     groupAdd,
     LinuxUserAlreadyExistsError,
@@ -155,6 +157,17 @@ __all__ = [
     'KafkaCharmBaseFeatureNotImplementedError'
 ]
 
+# PyYAML is considerably faster if built against libyaml
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def _parse_yaml(s):
+    """Parses a yaml config option, using libyaml's loader if available.
+
+    Returns an empty dict if the option is not set.
+    """
+    return yaml.load(s or "", Loader=_YAML_LOADER) or {}
+
 
 class KafkaJavaCharmBasePrometheusMonitorNode(BasePrometheusMonitor):
     """Prometheus Monitor node issues a request for prometheus2 to
@@ -524,7 +537,6 @@ class KafkaJavaCharmBase(JavaCharmBase):
             mode=0o755)
         with open(filepath, "wb") as f:
             f.write(base64.b64decode(k))
-            f.close()
         self.keytab_b64 = str(k)
         setFilePermissions(filepath, self.config.get("user", "root"),
                            self.config.get("group", "root"), 0o640)
@@ -584,9 +596,9 @@ class KafkaJavaCharmBase(JavaCharmBase):
         version = self.config.get("version", self.LATEST_VERSION_CONFLUENT)
         if self.distro == "confluent":
             url_key = 'https://packages.confluent.io/deb/{}/archive.key'
-            key = subprocess.check_output(
-                      ['wget', '-qO', '-',
-                       url_key.format(version)]).decode("ascii")
+            with urllib.request.urlopen(url_key.format(version),
+                                        timeout=30) as r:
+                key = r.read().decode("ascii")
             url_apt = \
                 'deb [arch=amd64] https://packages.confluent.io/deb/{}' + \
                 ' stable main'
@@ -890,17 +902,12 @@ class KafkaJavaCharmBase(JavaCharmBase):
             logger.warning("Data log dir config empty")
             BlockedStatus("data-log-dir missing, please define it")
             return
-        os.makedirs(data_log_dir, 0o750, exist_ok=True)
-        shutil.chown(data_log_dir,
-                     user=self.config["user"],
-                     group=self.config["group"])
-        dev, fs = None, None
+        self.set_folders_and_permissions([data_log_dir])
         if len(data_log_dev or "") == 0:
             logger.warning("Data log device not found, using rootfs instead")
         else:
-            for k, v in data_log_dev:
-                fs = k
-                dev = v
+            # data_log_dev is a single entry dict: {fs: dev}
+            fs, dev = next(iter(data_log_dev.items()))
             logger.info("Data log device: mkfs -t {}".format(fs))
             cmd = ["mkfs", "-t", fs, dev]
             subprocess.check_call(cmd)
@@ -926,38 +933,32 @@ class KafkaJavaCharmBase(JavaCharmBase):
             logger.warning("Data dir config empty")
             BlockedStatus("data-dir missing, please define it")
             return
-        os.makedirs(data_log_dir, 0o750, exist_ok=True)
-        shutil.chown(data_log_dir,
-                     user=self.config["user"],
-                     group=self.config["group"])
-        os.makedirs(data_dir, 0o750, exist_ok=True)
-        shutil.chown(data_dir,
-                     user=self.config["user"],
-                     group=self.config["group"])
-        dev, fs = None, None
+        self.set_folders_and_permissions([data_log_dir, data_dir])
+        # Each entry holds: device, folder to mount it and fs type
+        mounts = []
         if len(data_log_dev or "") == 0:
             logger.warning("Data log device not found, using rootfs instead")
         else:
-            for k, v in data_log_dev.items():
-                fs = k
-                dev = v
+            fs, dev = next(iter(data_log_dev.items()))
             logger.info("Data log device: mkfs -t {}".format(fs))
-            cmd = ["mkfs", "-t", fs, dev]
-            subprocess.check_call(cmd)
-            mount(dev, data_log_dir,
-                  options=self.config.get("fs-options", None),
-                  persist=True, filesystem=fs)
+            mounts.append((dev, data_log_dir, fs))
 
         if len(data_dev or "") == 0:
             logger.warning("Data device not found, using rootfs instead")
         else:
-            for k, v in data_dev.items():
-                fs = k
-                dev = v
-            logger.info("Data log device: mkfs -t {}".format(fs))
-            cmd = ["mkfs", "-t", fs, dev]
-            subprocess.check_call(cmd)
-            mount(dev, data_dir,
+            fs, dev = next(iter(data_dev.items()))
+            logger.info("Data device: mkfs -t {}".format(fs))
+            mounts.append((dev, data_dir, fs))
+
+        cmds = [["mkfs", "-t", fs, dev] for dev, _, fs in mounts]
+        if len(set(dev for dev, _, _ in mounts)) == len(mounts):
+            # Devices are independent, format them at the same time
+            check_call_concurrently(cmds)
+        else:
+            for cmd in cmds:
+                subprocess.check_call(cmd)
+        for dev, folder, fs in mounts:
+            mount(dev, folder,
                   options=self.config.get("fs-options", None),
                   persist=True, filesystem=fs)
 
@@ -987,17 +988,16 @@ class KafkaJavaCharmBase(JavaCharmBase):
                        class.
         """
 
-        service_unit_overrides = yaml.safe_load(
+        service_unit_overrides = _parse_yaml(
             self.config.get('service-unit-overrides', ""))
-        service_overrides = yaml.safe_load(
+        service_overrides = _parse_yaml(
             self.config.get('service-overrides', ""))
-        service_environment_overrides = yaml.safe_load(
+        service_environment_overrides = _parse_yaml(
             self.config.get('service-environment-overrides', ""))
 
-        if "KAFKA_OPTS" not in service_environment_overrides:
-            # Assume it will be needed, so adding it
-            service_environment_overrides["KAFKA_OPTS"] = ""
-        kafka_opts = []
+        # Extend any KAFKA_OPTS set via config options
+        existing = service_environment_overrides.get("KAFKA_OPTS")
+        kafka_opts = [existing] if existing else []
         if self.is_ssl_enabled():
             kafka_opts.append("-Djdk.tls.ephemeralDHKeySize=2048")
         if self.is_sasl_enabled():
@@ -1021,26 +1021,15 @@ class KafkaJavaCharmBase(JavaCharmBase):
                    group=self.config.get("group"),
                    perms=0o644,
                    context={})
-        if len(kafka_opts) == 0:
-            # Assumed KAFKA_OPTS would be set at some point
-            # however, it was not, so removing it
-            service_environment_overrides.pop("KAFKA_OPTS", None)
-        else:
-            service_environment_overrides["KAFKA_OPTS"] = \
-                '{}'.format(" ".join(kafka_opts))
+        joined = " ".join(kafka_opts)
+        if joined:
+            service_environment_overrides["KAFKA_OPTS"] = joined
             # Now, ensure all the kafka charms have their OPTS set:
-            if "SCHEMA_REGISTRY_OPTS" not in service_environment_overrides:
-                service_environment_overrides["SCHEMA_REGISTRY_OPTS"] = \
-                    service_environment_overrides["KAFKA_OPTS"]
-            if "KSQL_OPTS" not in service_environment_overrides:
-                service_environment_overrides["KSQL_OPTS"] = \
-                    service_environment_overrides["KAFKA_OPTS"]
-            if "KAFKAREST_OPTS" not in service_environment_overrides:
-                service_environment_overrides["KAFKAREST_OPTS"] = \
-                    service_environment_overrides["KAFKA_OPTS"]
-            if "CONTROL_CENTER_OPTS" not in service_environment_overrides:
-                service_environment_overrides["CONTROL_CENTER_OPTS"] = \
-                    service_environment_overrides["KAFKA_OPTS"]
+            for opts in ["SCHEMA_REGISTRY_OPTS", "KSQL_OPTS",
+                         "KAFKAREST_OPTS", "CONTROL_CENTER_OPTS"]:
+                service_environment_overrides.setdefault(opts, joined)
+        else:
+            service_environment_overrides.pop("KAFKA_OPTS", None)
         if extra_envvars:
             for k, v in extra_envvars.items():
                 service_environment_overrides[k] = v
@@ -171,7 +171,6 @@ class KafkaMDSRelation(KafkaRelationBase):
                 break
         with open(keypath, "w") as f:
             f.write(key)
-            f.close()
 
 
 class KafkaMDSProvidesRelation(KafkaMDSRelation):
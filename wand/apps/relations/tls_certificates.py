@@ -3,6 +3,8 @@ import uuid
 
 from ops.framework import Object
 
+from wand.security.ssl import PEM_CRT_BEGIN, PEM_CRT_END
+
 __all__ = [
     'TLSCertificateDataNotFoundInRelationError',
     'TLSCertificateRelationNotPresentError',
@@ -93,11 +95,9 @@ class TLSCertificateRequiresRelation(Object):
             to_publish_json['cert_requests'] = json.dumps(requests)
 
     def _process_cert(self, cert):
-        begin = "-----BEGIN CERTIFICATE-----"
-        end = "-----END CERTIFICATE-----"
-        return begin + \
-            cert.split(begin)[1].split(end)[0] + \
-            end + "\n"
+        return PEM_CRT_BEGIN + \
+            cert.split(PEM_CRT_BEGIN)[1].split(PEM_CRT_END)[0] + \
+            PEM_CRT_END + "\n"
 
     def get_server_certs(self):
         if not self.relation:
@@ -218,7 +218,6 @@ HOW TO IMPLEMENT IT ON YOUR CHARM - USE THE CALLBACK FUNCTION:
 
 """
 
-import copy
 import json
 import logging
 
@@ -261,19 +260,25 @@ class RestartEvent(EventBase):
 
         super().__init__(handle)
         self._ctx = json.dumps(ctx)
-        self._svc = copy.deepcopy(services)
+        self._svc = list(services)
 
     def snapshot(self):
         super().snapshot()
         return {
             "ctx": self._ctx,
-            "svc": ",".join(self._svc)
+            "svc": json.dumps(self._svc)
         }
 
     def restore(self, snapshot):
         super().restore(snapshot)
         self._ctx = snapshot["ctx"]
-        self._svc = snapshot["svc"].split(",")
+        try:
+            self._svc = json.loads(snapshot["svc"])
+        except ValueError:
+            # Events deferred before the json format was adopted were
+            # stored as a comma-joined string
+            self._svc = \
+                snapshot["svc"].split(",") if snapshot["svc"] else []
 
     @property
     def ctx(self):
@@ -98,7 +98,6 @@ class JavaCharmBase(CharmBase):
                len(t[PWD]) > 0 and len(t[GET_KEYSTORE]()) > 0:
                 logger.info("Create PKCS12 cert/key for {}".format(t[CERT]))
                 logger.debug("Iteration: {}".format(t))
-                filename = genRandomPassword(6)
                 PKCS12CreateKeystore(
                     t[GET_KEYSTORE](),
                     t[PWD],
@@ -107,9 +106,6 @@ class JavaCharmBase(CharmBase):
                     user=self.config["user"],
                     group=self.config["group"],
                     mode=0o640,
-                    openssl_chain_path="/tmp/" + filename + ".chain",
-                    openssl_key_path="/tmp/" + filename + ".key",
-                    openssl_p12_path="/tmp/" + filename + ".p12",
                     ks_regenerate=self.config.get(
                         "regenerate-keystore-truststore", False))
             elif not t[GET_KEYSTORE]():
@@ -123,6 +123,19 @@ def groupAdd(groupname,
     return subprocess.check_call(cmd)
 
 
+def check_call_concurrently(cmds):
+    """Runs all the cmds at once and waits for them to finish.
+
+    Raises CalledProcessError for the first cmd that failed, only after
+    all of them have finished.
+    """
+    procs = [subprocess.Popen(c) for c in cmds]
+    rcs = [p.wait() for p in procs]
+    for c, rc in zip(cmds, rcs):
+        if rc:
+            raise subprocess.CalledProcessError(rc, c)
+
+
 def set_folders_and_permissions(folders, user, group, mode=0o750):
     # Check folder permissions
     uid = pwd.getpwnam(user).pw_uid
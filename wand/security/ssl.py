@@ -10,15 +10,28 @@
 #  License for the specific language governing permissions and limitations
 #  under the License.
 
+import grp
 import os
+import pwd
+import re
+import secrets
 import shutil
 import string
 import subprocess
 from OpenSSL import crypto
+from cryptography import x509
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.serialization import pkcs12
 
 CHARS_PASSWORD = string.ascii_letters + string.digits
 PASSWORD_LEN = 48
 
+PEM_CRT_BEGIN = "-----BEGIN CERTIFICATE-----"
+PEM_CRT_END = "-----END CERTIFICATE-----"
+_PEM_CRT = PEM_CRT_BEGIN + r"\n.*?" + PEM_CRT_END + r"\n?"
+PEM_CRT_RE = re.compile(_PEM_CRT, re.DOTALL)
+PEM_CRT_RE_BYTES = re.compile(_PEM_CRT.encode(), re.DOTALL)
+
 
 nano = [
     '_break_crt_chain',
@@ -39,9 +52,12 @@ nano = [
 
 
 def _break_crt_chain(buffer):
-    return [i+"-----END CERTIFICATE-----\n"
-            for i in buffer.split("-----END CERTIFICATE-----\n")
-            if i.startswith("-----BEGIN CERTIFICATE-----\n")]
+    """Splits a PEM buffer (str or bytes) into a list of certificates,
+    each kept verbatim up to and including its END marker. The list
+    elements have the same type as buffer."""
+    if isinstance(buffer, bytes):
+        return PEM_CRT_RE_BYTES.findall(buffer)
+    return PEM_CRT_RE.findall(buffer)
 
 
 def saveCrtChainToFile(buffer,
@@ -51,42 +67,53 @@ def saveCrtChainToFile(buffer,
                        group=None,
                        force=False):
     crts = _break_crt_chain(buffer)
-    if _check_file_exists(cert_path) and not force:
-        raise Exception("{} already exists, aborting".format(cert_path))
-    if _check_file_exists(ca_chain_path) and not force:
-        raise Exception("{} already exists, aborting".format(ca_chain_path))
     # cert_path can be set to None, and all the files will the
     # certificates will be saved to ca_chain_path
     if cert_path:
-        with open(cert_path, "w") as f:
-            f.write(crts[0])
-            f.close()
-        with open(ca_chain_path, "w") as f:
-            f.write("\n".join(crts[1:]))
-            f.close()
+        files = [(cert_path, crts[0]), (ca_chain_path, "".join(crts[1:]))]
     else:
-        with open(cert_path, "w") as f:
-            f.write("\n".join(crts[0:]))
-            f.close()
+        files = [(ca_chain_path, "".join(crts))]
+    # Unless forced, files are created with O_EXCL instead of checking
+    # if they exist beforehand, so nothing can show up in between
+    written = []
+    for path, data in files:
+        try:
+            _write_file(path, data.encode(), exclusive=not force)
+        except FileExistsError:
+            for p in written:
+                os.remove(p)
+            raise Exception("{} already exists, aborting".format(path))
+        written.append(path)
     if user and group:
-        setFilePermissions(cert_path, user, group, mode=0o640)
-        setFilePermissions(ca_chain_path, user, group, mode=0o640)
+        _setFilesPermissions(written, user, group, mode=0o640)
 
 
-def _check_file_exists(path):
+def _write_file(path, data, mode=0o640, exclusive=False):
+    # Creates the file already with the final mode and writes it in one go
+    flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC
+    if exclusive:
+        flags |= os.O_EXCL
+    fd = os.open(path, flags, mode)
     try:
-        os.stat(path)
-    except FileNotFoundError:
-        return False
-    return True
+        # O_CREAT mode is masked by umask and ignored for existing
+        # files, so set it explicitly
+        os.fchmod(fd, mode)
+        os.write(fd, data)
+    finally:
+        os.close(fd)
+
+
+def _check_file_exists(path):
+    return os.path.exists(path)
 
 
 # NOTE(pguimaraes):
 # DO NOT change length default value below without updating
 # PASSWORD_LEN constant at the top of ssl.py
 def genRandomPassword(length=48):
-    return "".join(CHARS_PASSWORD[c % len(CHARS_PASSWORD)]
-                   for c in os.urandom(length))
+    # secrets.choice is backed by SystemRandom and, unlike indexing with
+    # urandom bytes modulo len(CHARS_PASSWORD), has no modulo bias
+    return "".join(secrets.choice(CHARS_PASSWORD) for _ in range(length))
 
 
 def RegisterIfKeystoreExists(path):
@@ -113,7 +140,7 @@ def generateSelfSigned(folderpath=None,
     key = crypto.PKey()
     key.generate_key(crypto.TYPE_RSA, keysize)
     cert = crypto.X509()
-    serNum = 0
+    serNum = 1
     valSecs = 10*365*24*60*60
     x509name = crypto.X509Name(crypto.X509().get_subject())
     x509name.countryName = "UK"
@@ -134,11 +161,9 @@ def generateSelfSigned(folderpath=None,
     with open(os.path.join(folder, cname + ".crt"), "w") as f:
         f.write(crypto.dump_certificate(
             crypto.FILETYPE_PEM, cert).decode("utf-8"))
-        f.close()
     with open(os.path.join(folder, cname + ".key"), "w") as f:
         f.write(crypto.dump_privatekey(
             crypto.FILETYPE_PEM, key).decode("utf-8"))
-        f.close()
     if user and group:
         setFilePermissions(os.path.join(folder, cname + ".crt"),
                            user, group, mode)
@@ -150,25 +175,27 @@ def generateSelfSigned(folderpath=None,
                 crypto.FILETYPE_PEM, key).decode("utf-8"))
 
 
+def _setFilesPermissions(paths, user, group, mode=0o640):
+    # Resolve user and group once for all the paths, shutil.chown would
+    # go through NSS on every call
+    uid = pwd.getpwnam(user).pw_uid
+    gid = grp.getgrnam(group).gr_gid
+    for p in paths:
+        os.chown(p, uid, gid)
+        os.chmod(p, mode)
+
+
 def SetTrustAndKeystoreFilePermissions(user, group,
                                        keystore_path,
                                        truststore_path):
-    shutil.chown(keystore_path, user=user, group=group)
-    os.chmod(keystore_path, 0o640)
-    shutil.chown(truststore_path, user=user, group=group)
-    os.chmod(truststore_path, 0o640)
+    _setFilesPermissions([keystore_path, truststore_path], user, group)
 
 
 def SetCertAndKeyFilePermissions(user, group,
                                  ca_cert_path,
                                  cert_path,
                                  key_path):
-    shutil.chown(ca_cert_path, user=user, group=group)
-    os.chmod(ca_cert_path, 0o640)
-    shutil.chown(cert_path, user=user, group=group)
-    os.chmod(cert_path, 0o640)
-    shutil.chown(key_path, user=user, group=group)
-    os.chmod(key_path, 0o640)
+    _setFilesPermissions([ca_cert_path, cert_path, key_path], user, group)
 
 
 def PKCS12CreateKeystore(keystore_path,
@@ -178,50 +205,34 @@ def PKCS12CreateKeystore(keystore_path,
                          user=None,
                          group=None,
                          mode=None,
-                         openssl_chain_path="/tmp/ks-charm-cert.chain",
-                         openssl_key_path="/tmp/ks-charm.key",
-                         openssl_p12_path="/tmp/ks-charm.p12",
+                         openssl_chain_path=None,
+                         openssl_key_path=None,
+                         openssl_p12_path=None,
                          ks_regenerate=False):
+    """Builds a PKCS12 keystore out of the PEM ssl_chain and ssl_key.
 
-    # We've saved the key and cert to /tmp, we cannot leave it there
-    # clean it up:
-    def __cleanup():
-        for i in [openssl_chain_path, openssl_key_path, openssl_p12_path]:
-            try:
-                os.remove(i)
-            except Exception:
-                pass
-    if ks_regenerate:
-        try:
-            os.remove(keystore_path)
-        except Exception:
-            pass
-    try:
-        with open(openssl_chain_path, "w") as f:
-            f.write(ssl_chain)
-            f.close()
-        with open(openssl_key_path, "w") as f:
-            f.write(ssl_key)
-            f.close()
-        pk12_cmd = ['openssl', 'pkcs12', '-export', '-in',
-                    openssl_chain_path,
-                    "-inkey", openssl_key_path,
-                    "-out", openssl_p12_path,
-                    "-name", "localhost", "-passout",
-                    "pass:{}".format(keystore_pwd)]
-        subprocess.check_call(pk12_cmd)
-        ks_cmd = ["keytool", "-importkeystore", "-srckeystore",
-                  openssl_p12_path, "-srcstoretype",
-                  "pkcs12", "-srcstorepass", keystore_pwd,
-                  "-destkeystore", keystore_path, "-deststoretype", "pkcs12",
-                  "-deststorepass", keystore_pwd, "-destkeypass", keystore_pwd]
-        subprocess.check_call(ks_cmd)
-        setFilePermissions(keystore_path, user, group, mode)
-    except Exception as e:
-        __cleanup()
-        raise e
-    # We clean up intermediate keys and certs for p12 anyway
-    __cleanup()
+    The keystore is serialized in-process and written to keystore_path.
+    The first cert of ssl_chain is used as the key's certificate, the
+    remaining ones are added as its CA chain. Any existing keystore at
+    keystore_path is replaced, which makes ks_regenerate a no-op kept
+    for backwards compatibility.
+
+    openssl_chain_path, openssl_key_path and openssl_p12_path used to
+    point to the intermediate files for openssl/keytool. No intermediate
+    files are used anymore, they are accepted and ignored for backwards
+    compatibility.
+    """
+    key = serialization.load_pem_private_key(ssl_key.encode(),
+                                             password=None)
+    chain = x509.load_pem_x509_certificates(ssl_chain.encode())
+    blob = pkcs12.serialize_key_and_certificates(
+        name=b"localhost", key=key, cert=chain[0], cas=chain[1:],
+        encryption_algorithm=serialization.BestAvailableEncryption(
+            keystore_pwd.encode()))
+    # Create the keystore already restricted, so the private key is never
+    # readable by others while the permissions are being set
+    _write_file(keystore_path, blob, mode=mode or 0o640)
+    setFilePermissions(keystore_path, user, group, mode)
 
 
 def CreateTruststore(ts_path,
@@ -231,7 +242,6 @@ def CreateTruststore(ts_path,
                      user=None,
                      group=None,
                      mode=None):
-    crtpath = "/tmp/juju_ca_cert"
     if ts_regenerate:
         try:
             os.remove(ts_path)
@@ -239,18 +249,22 @@ def CreateTruststore(ts_path,
             pass
     # small random string to act as prefix for the certs' alias
     host_rand = genRandomPassword(6)
-    counter = 0
-    for c in ts_certs:
-        with open(crtpath, "w") as f:
-            f.write(c)
-            f.close()
-        # ZK doc: alias must change per cert added
-        ts_cmd = ["keytool", "-noprompt", "-keystore", ts_path,
-                  "-storetype", "pkcs12", "-alias",
-                  "host.{}.{}".format(host_rand, counter),
-                  "-trustcacerts", "-import", "-file", crtpath,
-                  "-deststorepass", ts_pwd]
-        subprocess.check_call(ts_cmd)
-        setFilePermissions(ts_path, user, group, mode)
-        counter += 1
-    os.remove(crtpath)
+    # Each cert is staged in memory instead of a scratch file on disk,
+    # keytool reads it through the fd inherited from this process
+    mfd = os.memfd_create("juju_ca")
+    crtpath = "/proc/self/fd/{}".format(mfd)
+    try:
+        for counter, c in enumerate(ts_certs):
+            os.ftruncate(mfd, 0)
+            os.pwrite(mfd, c.encode(), 0)
+            # ZK doc: alias must change per cert added
+            ts_cmd = ["keytool", "-noprompt", "-keystore", ts_path,
+                      "-storetype", "pkcs12", "-alias",
+                      "host.{}.{}".format(host_rand, counter),
+                      "-trustcacerts", "-import", "-file", crtpath,
+                      "-storepass", ts_pwd]
+            subprocess.check_call(ts_cmd, pass_fds=(mfd,))
+        if ts_certs:
+            setFilePermissions(ts_path, user, group, mode)
+    finally:
+        os.close(mfd)